@@ -47,6 +47,8 @@ class hardware_interface:
 	def __init__(self):
 		self.Light_state = 0
 		self.Fan_state = 0
+		# Fitted thermal_model used for predictive control, the threshold checks are purely reactive when no model is set
+		self.model = None
 		print("Hardware interface is initialized")
 	
 	##############################
@@ -63,6 +65,12 @@ class hardware_interface:
 		GPIO.setup(Fans, GPIO.OUT, initial = GPIO.LOW) # Fans
 		GPIO.setup(Water_Valve, GPIO.OUT, initial = GPIO.LOW) # Water valve
 		GPIO.setup(Lights, GPIO.OUT, initial = GPIO.LOW) # LED Lamp
+	
+	# Turns the actuators off and releases the GPIO pins once they are no longer in use
+	def cleanup_GPIO(self):
+		self.turn_fans_off()
+		self.turn_light_off()
+		GPIO.cleanup()
 		
 	
 	####################################################### 
@@ -256,6 +264,17 @@ class hardware_interface:
 	# Methods that control the greenhouse environment #
 	###################################################
 	
+	# Sets the fitted thermal_model that switches the lamp and fans ahead of threshold crossings
+	def set_model(self, model):
+		self.model = model
+	
+	# Internal temperature expected after the given number of seconds if the fans stay off
+	# Without fans the only modelled heat source is the LED lamp, otherwise the temperature is assumed to hold
+	def predict_idle_temp(self, internal_temp, external_temp, seconds):
+		if self.get_lighting_state() == 1 and self.model.has("Lamp_Temperature"):
+			return self.model.predict_lamp_temp(internal_temp, external_temp, seconds)
+		return internal_temp
+	
 	############
 	# Lighting #
 	############
@@ -266,6 +285,22 @@ class hardware_interface:
 		light_reading = self.get_light_reading()
 		internal_temp = self.get_internal_temp()
 		
+		# Predictive control: the lamp is turned off before the lamp model crosses the temperature limit
+		# A lamp that is off only turns on if it can stay on for the minimum run time without crossing the limit
+		# The reactive temperature check still applies, the model can only turn the lamp off earlier
+		if self.model is not None and self.model.has("Lamp_Temperature"):
+			external_temp = self.get_external_temp()
+			horizon = self.model.settings["Prediction_Horizon"]
+			if self.get_lighting_state() == 0:
+				horizon += self.model.settings["Minimum_Run_Time"]
+			
+			if (light_reading == 1 and internal_temp <= (Threshold["Temp_Threshold"] + 2) and
+					self.model.predict_lamp_temp(internal_temp, external_temp, horizon) <= (Threshold["Temp_Threshold"] + 2)):
+				self.turn_light_on()
+			else:
+				self.turn_light_off()
+			return
+		
 		if light_reading == 1 and internal_temp <= (Threshold["Temp_Threshold"] + 2):
 			self.turn_light_on() 
 		elif light_reading == 0 or internal_temp > (Threshold["Temp_Threshold"] + 2):
@@ -304,6 +339,24 @@ class hardware_interface:
 			self.turn_fans_on()	
 		elif internal_temp >= Threshold["Temp_Threshold"] and internal_temp > external_temp:
 			self.turn_fans_on()
+		elif self.model is not None and self.predict_overheating(internal_temp, external_temp):
+			self.turn_fans_on()
 		else:
 			self.turn_fans_off()
+	
+	# Predictive control: the fans are turned on before the lamp heats the greenhouse past the temperature threshold
+	# Fans that are on only turn off if the temperature will stay below the threshold for the minimum run time
+	# This only adds to the reactive checks above, so the model can switch the fans on earlier but never keep them off
+	def predict_overheating(self, internal_temp, external_temp):
+		horizon = self.model.settings["Prediction_Horizon"]
+		if self.get_fan_state() == 1:
+			horizon += self.model.settings["Minimum_Run_Time"]
+		
+		# Ventilating only helps if the fan model settles below the current internal temperature
+		if self.model.has("Fan_Temperature"):
+			cooling = self.model.predict_fan_temp(internal_temp, external_temp, horizon) < internal_temp
+		else:
+			cooling = internal_temp > external_temp
+		
+		return cooling and self.predict_idle_temp(internal_temp, external_temp, horizon) >= Threshold["Temp_Threshold"]
 		
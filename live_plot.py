@@ -0,0 +1,163 @@
+import time
+from collections import deque
+import matplotlib.pyplot as plt
+
+####################################################
+# Dictionary storing the settings of the live view #
+####################################################
+
+# Window: width of the visible range in samples, the plots scroll by half a window so between Window/2 and Window samples are shown
+# Frame_Rate: maximum number of redraws per second
+Live_Settings = {
+	"Window":		300,
+	"Frame_Rate":	10}
+
+class live_plot:
+
+	# panels: list of (y-axis label, [line labels]) pairs, one subplot per panel
+	def __init__(self, title, panels, window = Live_Settings["Window"], frame_rate = Live_Settings["Frame_Rate"]):
+		self.window = window
+		self.frame_interval = 1/frame_rate
+		self.last_frame = 0
+		self.pending = False
+		self.rescale = False
+		self.closed = False
+		self.background = None
+
+		# Only the visible samples are stored so that every redraw takes the same amount of time
+		self.samples = deque(maxlen = window)
+		self.values = []
+		self.lines = []
+
+		plt.ion()
+		self.figure, axes = plt.subplots(len(panels), 1, sharex = True, squeeze = False)
+		self.figure.suptitle(title)
+		self.axes = axes[:, 0]
+
+		for ax, (ylabel, labels) in zip(self.axes, panels):
+			ax.set_ylabel(ylabel)
+			for label in labels:
+				# Animated lines are left out of the full redraws and drawn on top of the saved background instead
+				line, = ax.plot([], [], label = label, animated = True)
+				self.lines.append(line)
+				self.values.append(deque(maxlen = window))
+			if len(labels) > 1:
+				ax.legend(loc = 'upper left')
+		self.axes[-1].set_xlabel('Samples')
+		self.axes[-1].set_xlim(0, window)
+
+		self.canvas = self.figure.canvas
+		self.canvas.mpl_connect('draw_event', self.on_draw)
+		self.canvas.mpl_connect('close_event', self.on_close)
+		plt.show(block = False)
+
+		# Worst-case time (in seconds) of a blitted frame and of a full redraw, the first full redraw is timed here
+		self.blit_time = 0
+		start = time.time()
+		self.canvas.draw()
+		self.redraw_time = time.time() - start
+
+	#####################
+	# Matplotlib events #
+	#####################
+
+	# A full redraw (first draw, resizing or rescaling the axes) invalidates the saved background
+	def on_draw(self, event):
+		self.background = self.canvas.copy_from_bbox(self.figure.bbox)
+		self.draw_lines()
+
+	# Closing the window is used to abort the test early
+	def on_close(self, event):
+		self.closed = True
+
+	#####################
+	# Updating the view #
+	#####################
+
+	# Stores the readings of one sample, this is called from the sampling loop and doesn't draw anything
+	def add(self, sample, readings):
+		self.samples.append(sample)
+		for values, reading in zip(self.values, readings):
+			values.append(reading)
+		self.pending = True
+
+	def draw_lines(self):
+		for line in self.lines:
+			self.figure.draw_artist(line)
+
+	# Updates the existing lines in place, the axes are only rescaled when the data leaves them
+	# A rescale needs a full redraw instead of a blit, it stays pending until that redraw is done
+	def update_lines(self):
+		scrolled = False
+		left, right = self.axes[-1].get_xlim()
+		if self.samples[-1] > right:
+			# Scrolls by half a window at a time so the full redraw is rare
+			left = self.samples[-1] - self.window/2
+			self.axes[-1].set_xlim(left, left + self.window)
+			self.rescale = True
+			scrolled = True
+
+			# Samples that scrolled off the plots are dropped so the stored data matches the visible range
+			while self.samples[0] < left:
+				self.samples.popleft()
+				for values in self.values:
+					values.popleft()
+
+		for line, values in zip(self.lines, self.values):
+			line.set_data(self.samples, values)
+
+		# The y-limits only cover the visible samples, so a sensor glitch stops affecting them once it scrolls off
+		# They are fitted again when the x-axis scrolls (already a full redraw), when the data leaves them or when it fills less than half of them
+		for ax in self.axes:
+			readings = [reading for line, values in zip(self.lines, self.values) if line.axes is ax for reading in values]
+			low, high = min(readings), max(readings)
+			margin = max((high - low)*0.1, 1)
+			bottom, top = ax.get_ylim()
+			if scrolled or low < bottom or high > top or (high - low + 2*margin) < (top - bottom)/2:
+				ax.set_ylim(low - margin, high + margin)
+				self.rescale = True
+
+		if self.background is None:
+			self.rescale = True
+
+	# Draws the updated lines and records how long the frame took
+	def draw(self):
+		start = time.time()
+
+		if self.rescale:
+			self.canvas.draw()
+			self.rescale = False
+			self.redraw_time = max(self.redraw_time, time.time() - start)
+		else:
+			self.canvas.restore_region(self.background)
+			self.draw_lines()
+			self.canvas.blit(self.figure.bbox)
+			self.blit_time = max(self.blit_time, time.time() - start)
+
+	# Replaces time.sleep() between samples: the view is redrawn at a capped frame rate while waiting for the next sample
+	# A frame is only drawn if the slowest frame of its kind (blit or full redraw) so far would finish before the next sample is due
+	# This keeps the drawing done by the live view from delaying the sensor reads, apart from a frame that is slower than any before it
+	def wait(self, seconds):
+		deadline = time.time() + seconds
+
+		while not self.closed:
+			now = time.time()
+			if self.pending and now - self.last_frame >= self.frame_interval:
+				self.update_lines()
+				frame_time = self.redraw_time if self.rescale else self.blit_time
+				if deadline - now > frame_time:
+					self.draw()
+					self.pending = False
+					self.last_frame = now
+
+			self.canvas.flush_events()
+			remaining = deadline - time.time()
+			if remaining <= 0:
+				return
+			time.sleep(min(remaining, self.frame_interval))
+
+		time.sleep(max(deadline - time.time(), 0))
+
+	# Returns matplotlib to blocking mode so the final plots of the test stay open
+	def finish(self):
+		plt.ioff()
@@ -4,6 +4,9 @@ import time
 import matplotlib.pyplot as plt
 import numpy as np
 from hardware_interface import hardware_interface
+from scheduler import photoperiod_scheduler
+import thermal_model
+from live_plot import live_plot
 
 
 if __name__ == '__main__':
@@ -34,6 +37,9 @@ if __name__ == '__main__':
 	parser.add_argument('-l', '--lights', action = 'store_true', help = 'Turns the LED lamp on then off after 10 seconds')
 	parser.add_argument('-w', '--water', action = 'store_true', help = 'Opens the water valve for 2 seconds')
 	parser.add_argument('-f', '--fans', action = 'store_true', help = 'Turns the fans on then off after 10 seconds')
+	parser.add_argument('-ft', '--fit', action = 'store_true', help = 'Fits the thermal and humidity model of the greenhouse from the heating and ventilation test logs')
+	parser.add_argument('-lv', '--live', action = 'store_true', help = 'Shows the sensor data live while the control, heating or ventilation test is running, closing the window ends the test early')
+	parser.add_argument('-p', '--predictive', action = 'store_true', help = 'Uses the fitted model to switch the lamp and fans ahead of threshold crossings during the control operation and test')
 
 	
 	################################################################
@@ -42,44 +48,53 @@ if __name__ == '__main__':
 	
 	args = parser.parse_args()	
 	
+	################################
+	# Fitting the greenhouse model #
+	################################
+	
+	# Estimates the first-order response of the greenhouse from the logs of the LED lamp heating test and the ventilation test
+	# The responses that could be fitted are saved so that the predictive control can load them
+	if args.fit:
+		model, failures = thermal_model.fit_model()
+		
+		if "Lamp_Temperature" in model:
+			print("Lamp heating: settles " + str(round(model["Lamp_Temperature"]["Offset"], 2)) + " *C above the external temperature with a time constant of " + str(round(model["Lamp_Temperature"]["Time_Constant"])) + " s")
+		if "Fan_Temperature" in model:
+			print("Ventilation temperature: settles " + str(round(model["Fan_Temperature"]["Offset"], 2)) + " *C from the external temperature with a time constant of " + str(round(model["Fan_Temperature"]["Time_Constant"])) + " s")
+		if "Fan_Humidity" in model:
+			print("Ventilation humidity: settles at " + str(round(model["Fan_Humidity"]["Final_Value"], 2)) + " % with a time constant of " + str(round(model["Fan_Humidity"]["Time_Constant"])) + " s")
+		for name in failures:
+			print("Could not fit " + name + " (" + failures[name] + "), the control will use the reactive checks for it")
+		
+		if model:
+			thermal_model.save_model(model)
+			print("Model saved to thermal_model.json")
+		else:
+			print("None of the responses could be fitted, the model was not saved")
+	
+	# Switches the control algorithm to predictive control using the saved model
+	if args.predictive:
+		try:
+			component.set_model(thermal_model.load_model())
+		except (OSError, ValueError) as error:
+			print("Could not load thermal_model.json (" + str(error) + "), run with --fit first. Using the reactive control instead")
+	
 	###################################
 	# Environmental Control Algorithm #
 	###################################
 	
 	# Runs the intended greenhouse environmental control algorithm
-	# The system will operate for 12 hours then go on standby for another 12 hours
+	# The system follows the photoperiod calendar in scheduler.py: by default it operates for 12 hours then goes on standby for another 12 hours
 	# During the operational time the program will continuously read data from the sensors and will decide which actuators to activate/ deactivate to control the greenhouse environment within the acceptable parameters
+	# During standby the lamp stays off and a low-rate watchdog keeps the fans reacting to heat and humidity emergencies
 	# Sensor data will be displayed once every 10 iterations of the control loop
 	if args.run:
-		while True:
-			# System in operation for 12 hours
-			duration = time.time() + 12*60*60
-			iteration = 0
-			while time.time() < duration:
-				# Displaying current sensor data
-				if iteration == 10:
-					print("External Temperature: " + str(component.get_external_temp()) + " *C \n" +
-						  "Internal Temperature: " + str(component.get_internal_temp()) + " *C \n" +	
-						  "Relative Humidity: " + str(component.get_humidity()) + " % \n" + 
-						  "CO2 Concentration: " + str(component.get_CO2()) + " ppm \n" + 
-						  "Lighting State: " + str(component.get_light_reading()) +  "\n" +
-						  "Soil Moisture State: " + str(component.get_soil_moisture()*100/1024) + "%")
-					iteration = 0
-				
-				# Control loop
-				component.light_control()
-				component.ventilation()
-				# Unfortunetly the valve doesn't work due to the water pressure being too low to initialize itself
-				# component.water_control()
-				time.sleep(5)
-				iteration += 1
-			
-			# Turns off any GPIO pins as they are not in use 
-			GPIO.cleanup()
-			# System goes on standy for 12 hours	
-			time.sleep(12*60*60)
-			# Refreshes the GPIO pins to be ready for operation
-			component.initialize_GPIO()
+		schedule = photoperiod_scheduler(component)
+		try:
+			schedule.run()
+		finally:
+			# Turns off any GPIO pins as they are not in use
+			component.cleanup_GPIO()
 					
 	##############################
 	# Environmental Control Test #
@@ -108,10 +123,19 @@ if __name__ == '__main__':
 		lighting_states = []
 		fan_states = []
 		
+		# Optional live view of the test data
+		if args.live:
+			live_view = live_plot("Environmental Control Test", [
+				('Temperature (*C)', ['External Temperature', 'Internal Temperature']),
+				('Relative Humidity (%)', ['Relative Humidity']),
+				('CO2 Concentration (ppm)', ['CO2 Concentration']),
+				('Soil Moisture (%)', ['Soil Moisture']),
+				('State', ['Ambient Lighting', 'Lighting State', 'Fans State'])])
+		
 		# Obtaining test data
 		print("Starting Environmental Control Test")
 		duration = time.time() + 60*30
-		while time.time() < duration:
+		while time.time() < duration and not (args.live and live_view.closed):
 			# Capturing sensor data
 			e_temp = component.get_external_temp()
 			i_temp = component.get_internal_temp()
@@ -136,6 +160,9 @@ if __name__ == '__main__':
 			sensor_output = str(readings) + "," + str(e_temp) + "," + str(i_temp) + "," + str(hum) + "," + str(co2) + "," + str(lighting) + "," + str(moisture) + "," + str(l_state) + "," + str(f_state) + "\n"
 			ec_log.write(sensor_output)
 			
+			if args.live:
+				live_view.add(readings, [e_temp, i_temp, hum, co2, moisture, lighting, l_state, f_state])
+			
 			readings += 1
 			
 			# Displays sensor data periodically
@@ -148,13 +175,22 @@ if __name__ == '__main__':
 			# Unfortunetly the valve doesn't work due to the water pressure being too low to initialize itself
 			# component.water_control() 
 			
-			time.sleep(5)
+			# The live view is redrawn while waiting for the next sample
+			if args.live:
+				live_view.wait(5)
+			else:
+				time.sleep(5)
 		
 		ec_log.close()
 		component.turn_fans_off()
 		component.turn_light_off()	
 		print("Environmental control test is complete")
 		
+		if args.live:
+			live_view.finish()
+			if live_view.closed:
+				print("Live view was closed, the test was ended early")
+		
 		# Displaying the test results as multiple plots	
 		samples = np.arange(0, readings, 1)	
 		
@@ -236,21 +272,35 @@ if __name__ == '__main__':
 		
 		# Opening log file to append testing data
 		lamp_heating_log = open("lamp_heating_log.csv", "a")
-		lamp_heating_log.write("Sample #, Temperature \n")
+		lamp_heating_log.write("Sample #, Elapsed Time, External Temperature, Temperature \n")
 		
 		# Initializing storage variables
 		temperature_readings = []
 		readings = 0
 		
+		# Optional live view of the test data
+		if args.live:
+			live_view = live_plot("LED Lamp Heating Test", [('Temperature (*C)', ['Temperature'])])
+		
 		# Obtaining test data
-		duration = time.time() + 60*30
+		start_time = time.time()
+		duration = start_time + 60*30
 		component.turn_light_on()
-		while time.time() < duration:
+		while time.time() < duration and not (args.live and live_view.closed):
+			e_temp = component.get_external_temp()
 			temp = component.get_internal_temp()
+			# Elapsed time is logged as the sampling period varies with the sensor read retries
+			# It is taken right after the internal temperature read as that is the reading the lamp response is fitted to
+			elapsed = round(time.time() - start_time, 2)
 			temperature_readings.append(temp)
-			output = str(readings) + "," + str(temp) + "\n"
+			output = str(readings) + "," + str(elapsed) + "," + str(e_temp) + "," + str(temp) + "\n"
 			lamp_heating_log.write(output)
-			time.sleep(2)
+			
+			if args.live:
+				live_view.add(readings, [temp])
+				live_view.wait(2)
+			else:
+				time.sleep(2)
 			readings += 1
 			
 			if readings % 10 == 0:
@@ -260,8 +310,14 @@ if __name__ == '__main__':
 		component.turn_light_off()
 		print("LED lamp heating test is complete")
 		
+		if args.live:
+			live_view.finish()
+			if live_view.closed:
+				print("Live view was closed, the test was ended early")
+		
 		# Displaying the test data as a graph
 		samples = np.arange(0, readings, 1)
+		heating_fig = plt.figure("LED Lamp Heating Test")
 		plt.plot(samples, temperature_readings)
 		plt.xlabel('Samples')
 		plt.ylabel('Temperature (*C)')
@@ -290,27 +346,46 @@ if __name__ == '__main__':
 		
 		# Opening log file to append testing data
 		ventilation_log = open("ventilation_log.csv", "a")
-		ventilation_log.write("Sample #, External Temperature, Internal Temperature, Relative Humidity, CO2 concentration \n")
+		ventilation_log.write("Sample #, Elapsed Time, External Temperature, Internal Temperature, Relative Humidity, CO2 concentration \n")
+		
+		# Optional live view of the test data
+		if args.live:
+			live_view = live_plot("Ventilation Test", [
+				('Temperature (*C)', ['External Temperature', 'Internal Temperature']),
+				('Relative Humidity (%)', ['Relative Humidity']),
+				('CO2 Concentration (ppm)', ['CO2 Concentration'])])
 		
 		# Obtaining test data
-		duration = time.time() + 60*30
+		start_time = time.time()
+		duration = start_time + 60*30
 		component.turn_fans_on()
-		while time.time() < duration:
+		while time.time() < duration and not (args.live and live_view.closed):
 			e_temp = component.get_external_temp()
 			i_temp = component.get_internal_temp()
+			i_temp_time = time.time()
 			hum = component.get_humidity()
+			hum_time = time.time()
 			co2 = component.get_CO2()
+			# Elapsed time is logged as the sampling period varies with the sensor read retries
+			# Both the internal temperature and humidity responses are fitted, so the times of those two reads are averaged
+			elapsed = round((i_temp_time + hum_time)/2 - start_time, 2)
 			
 			external_temp.append(e_temp)
 			internal_temp.append(i_temp)
 			humidity.append(hum)
 			co2_concentration.append(co2)
 			
-			output = str(readings) + "," + str(e_temp) + "," + str(i_temp) + "," + str(hum) + "," + str(co2) + " \n"
+			output = str(readings) + "," + str(elapsed) + "," + str(e_temp) + "," + str(i_temp) + "," + str(hum) + "," + str(co2) + " \n"
 			ventilation_log.write(output)
+			
+			if args.live:
+				live_view.add(readings, [e_temp, i_temp, hum, co2])
 		
 			readings += 1
-			time.sleep(2)
+			if args.live:
+				live_view.wait(2)
+			else:
+				time.sleep(2)
 			
 			if readings % 10 == 0:
 				print(output)
@@ -318,6 +393,11 @@ if __name__ == '__main__':
 		ventilation_log.close()
 		component.turn_fans_off()
 		print("Ventilation Test is complete")
+		
+		if args.live:
+			live_view.finish()
+			if live_view.closed:
+				print("Live view was closed, the test was ended early")
 
 		# Displaying the test results as multiple plots
 		samples = np.arange(0, readings, 1)
@@ -0,0 +1,114 @@
+import sched
+import time
+
+############################################################################
+# Dictionaries storing the photoperiod calendar and the day/night profiles #
+############################################################################
+
+# The lighting day starts at Day_Start (hour of the day, local time) and lasts for Day_Length hours
+# The rest of the 24 hours is spent on standby
+Photoperiod = {
+	"Day_Start":	6.0,
+	"Day_Length":	12.0}
+
+# Day: the full control loop runs every Control_Interval seconds and sensor data is displayed every Display_Interval iterations
+# Night: the lamp is kept off and a low-rate watchdog checks the ventilation every Watchdog_Interval seconds
+Profiles = {
+	"Day": {
+		"Control_Interval":		5,
+		"Display_Interval":		10},
+	"Night": {
+		"Watchdog_Interval":	5*60}}
+
+class photoperiod_scheduler:
+
+	def __init__(self, component, photoperiod = Photoperiod, profiles = Profiles):
+		self.component = component
+		self.photoperiod = photoperiod
+		self.profiles = profiles
+		self.iteration = 0
+		# Timer based event queue, the program sleeps until the next event is due instead of sleeping through the standby period
+		self.events = sched.scheduler(time.time, time.sleep)
+
+	########################
+	# Photoperiod calendar #
+	########################
+
+	# Seconds elapsed since the start of the current (or most recent) lighting day
+	def time_into_day(self, now):
+		local = time.localtime(now)
+		seconds_since_midnight = local.tm_hour*60*60 + local.tm_min*60 + local.tm_sec + (now % 1)
+		return (seconds_since_midnight - self.photoperiod["Day_Start"]*60*60) % (24*60*60)
+
+	def is_daytime(self, now):
+		return self.time_into_day(now) < self.photoperiod["Day_Length"]*60*60
+
+	# Time at which the system next switches between operation and standby
+	def next_transition(self, now):
+		elapsed = self.time_into_day(now)
+		day_length = self.photoperiod["Day_Length"]*60*60
+
+		if elapsed < day_length:
+			return now + (day_length - elapsed)
+		return now + (24*60*60 - elapsed)
+
+	######################
+	# Running the system #
+	######################
+
+	# Runs until interrupted, only waking up when a timer is due
+	def run(self):
+		self.change_mode()
+		self.events.run()
+
+	# Cancels the timers of the previous mode and starts the mode matching the current time of day
+	def change_mode(self):
+		for event in self.events.queue:
+			self.events.cancel(event)
+
+		now = time.time()
+		if self.is_daytime(now):
+			print("Greenhouse is in operation")
+			self.iteration = 0
+			self.events.enterabs(now, 1, self.control_step)
+		else:
+			print("Greenhouse is on standby")
+			self.component.turn_light_off()
+			self.events.enterabs(now, 1, self.watchdog_step)
+
+		self.events.enterabs(self.next_transition(now), 0, self.change_mode)
+
+	# One iteration of the environmental control loop
+	# Sensor data will be displayed once every Display_Interval iterations of the control loop
+	def control_step(self):
+		profile = self.profiles["Day"]
+
+		if self.iteration == profile["Display_Interval"]:
+			print("External Temperature: " + str(self.component.get_external_temp()) + " *C \n" +
+				  "Internal Temperature: " + str(self.component.get_internal_temp()) + " *C \n" +
+				  "Relative Humidity: " + str(self.component.get_humidity()) + " % \n" +
+				  "CO2 Concentration: " + str(self.component.get_CO2()) + " ppm \n" +
+				  "Lighting State: " + str(self.component.get_light_reading()) + "\n" +
+				  "Soil Moisture State: " + str(self.component.get_soil_moisture()*100/1024) + "%")
+			self.iteration = 0
+
+		# Control loop
+		self.component.light_control()
+		self.component.ventilation()
+		# Unfortunetly the valve doesn't work due to the water pressure being too low to initialize itself
+		# self.component.water_control()
+		self.iteration += 1
+
+		self.events.enter(profile["Control_Interval"], 1, self.control_step)
+
+	# Standby watchdog, the lamp stays off but the fans still react to heat and humidity emergencies
+	def watchdog_step(self):
+		fan_state = self.component.get_fan_state()
+		self.component.ventilation()
+
+		if self.component.get_fan_state() != fan_state:
+			print("Standby watchdog turned the fans " + ("on" if self.component.get_fan_state() == 1 else "off") + ": " +
+				  "Internal Temperature: " + str(self.component.get_internal_temp()) + " *C, " +
+				  "Relative Humidity: " + str(self.component.get_humidity()) + " %")
+
+		self.events.enter(self.profiles["Night"]["Watchdog_Interval"], 1, self.watchdog_step)
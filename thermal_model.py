@@ -0,0 +1,142 @@
+import json
+import numpy as np
+
+##############################################################################
+# Dictionary storing the settings used to fit and apply the greenhouse model #
+##############################################################################
+
+# Smoothing_Window: number of samples averaged before fitting, the DHT11 sensors only have a resolution of 1 *C and 1 %
+# Prediction_Horizon: how far ahead (in seconds) the controller looks for threshold crossings
+# Minimum_Run_Time: how long (in seconds) a relay should be able to hold its new state before it is switched
+Model_Settings = {
+	"Smoothing_Window":		15,
+	"Prediction_Horizon":	60,
+	"Minimum_Run_Time":		120}
+
+# Column 1 of both logs is the elapsed time of each sample in seconds
+# Heating log: Sample #, Elapsed Time, External Temperature, Temperature
+# Ventilation log: Sample #, Elapsed Time, External Temperature, Internal Temperature, Relative Humidity, CO2 concentration
+Log_Columns = {
+	"Heating":		4,
+	"Ventilation":	6}
+
+########################################
+# Fitting the model from the test logs #
+########################################
+
+# Loads the sensor data of a test log as a 2D array, one row per sample
+# The number of columns is checked first so that a log in an older format isn't fitted with its columns shifted
+def load_log(filename, columns):
+	log = np.loadtxt(filename, delimiter = ",", skiprows = 1, ndmin = 2)
+
+	if len(log) == 0:
+		raise ValueError("The log doesn't have any samples, re-run the test")
+	if log.shape[1] != columns:
+		raise ValueError("The log has " + str(log.shape[1]) + " columns instead of " + str(columns) + ", it predates the Elapsed Time column, re-run the test")
+
+	return log
+
+# Moving average of the readings, without it the coarse sensor steps make the fitted response far too fast
+def smooth(readings, window = Model_Settings["Smoothing_Window"]):
+	if len(readings) < window + 2:
+		raise ValueError("The log doesn't have enough samples, the test needs to run for longer")
+	return np.convolve(readings, np.ones(window)/window, mode = "valid")
+
+# Rate of change of the readings using the measured time between samples
+# The sampling period isn't fixed as the DHT11 reads retry with a 2 second delay whenever they fail
+def rate_of_change(readings, times):
+	return np.diff(readings)/np.diff(times)
+
+# Fits a first-order response dx/dt = a + b*x with least squares
+# Returns the time constant (in seconds) and the value the response settles at
+def fit_settling_response(readings, times):
+	readings = smooth(readings)
+	rate = rate_of_change(readings, smooth(times))
+	A = np.column_stack((np.ones(len(rate)), readings[:-1]))
+	(a, b), _, _, _ = np.linalg.lstsq(A, rate, rcond = None)
+
+	if not b < 0:
+		raise ValueError("The readings do not settle to a steady value, the test needs to run for longer")
+
+	return {"Time_Constant": -1/b, "Final_Value": -a/b}
+
+# Fits a first-order response dx/dt = a + c*(u - x) with least squares, where u is the driving input
+# Returns the time constant (in seconds) and the offset of the settled value from the input
+def fit_driven_response(readings, inputs, times):
+	readings = smooth(readings)
+	inputs = smooth(inputs)
+	rate = rate_of_change(readings, smooth(times))
+	A = np.column_stack((np.ones(len(rate)), inputs[:-1] - readings[:-1]))
+	(a, c), _, _, _ = np.linalg.lstsq(A, rate, rcond = None)
+
+	if not c > 0:
+		raise ValueError("The readings do not follow the input, the test needs to run for longer")
+
+	return {"Time_Constant": 1/c, "Offset": a/c}
+
+# Internal temperature while the lamp is on, driven by the external temperature
+def fit_lamp_temperature(heating):
+	return fit_driven_response(heating[:, 3], heating[:, 2], heating[:, 1])
+
+# Internal temperature while the fans are on, driven by the external temperature
+def fit_fan_temperature(ventilation):
+	return fit_driven_response(ventilation[:, 3], ventilation[:, 2], ventilation[:, 1])
+
+# Relative humidity while the fans are on
+def fit_fan_humidity(ventilation):
+	return fit_settling_response(ventilation[:, 4], ventilation[:, 1])
+
+# Identifies the greenhouse response from the LED lamp heating test and ventilation test logs
+# Each response is fitted on its own, so one that can't be fitted doesn't lose the others
+# Returns the fitted responses and the reason each of the other responses couldn't be fitted
+def fit_model(heating_log = "lamp_heating_log.csv", ventilation_log = "ventilation_log.csv"):
+	model = {}
+	failures = {}
+
+	for name, filename, columns, fit in (("Lamp_Temperature", heating_log, Log_Columns["Heating"], fit_lamp_temperature),
+										 ("Fan_Temperature", ventilation_log, Log_Columns["Ventilation"], fit_fan_temperature),
+										 ("Fan_Humidity", ventilation_log, Log_Columns["Ventilation"], fit_fan_humidity)):
+		try:
+			model[name] = fit(load_log(filename, columns))
+		# A missing log, a log in an older format, a log with too few samples or readings that don't settle
+		except (OSError, ValueError) as error:
+			failures[name] = filename + ": " + str(error)
+
+	return model, failures
+
+def save_model(model, filename = "thermal_model.json"):
+	with open(filename, "w") as model_file:
+		json.dump(model, model_file, indent = 4)
+
+def load_model(filename = "thermal_model.json"):
+	with open(filename, "r") as model_file:
+		return thermal_model(json.load(model_file))
+
+#########################################
+# Predicting the greenhouse environment #
+#########################################
+
+class thermal_model:
+
+	def __init__(self, parameters, settings = Model_Settings):
+		self.parameters = parameters
+		self.settings = settings
+
+	# Whether the given response was fitted, the control uses the reactive checks for responses that weren't
+	def has(self, response):
+		return response in self.parameters
+
+	# Value of a first-order response after the given number of seconds
+	def settle(self, reading, final_value, time_constant, seconds):
+		return final_value + (reading - final_value)*np.exp(-seconds/time_constant)
+
+	# Internal temperature after the given number of seconds if the lamp is on
+	# The lamp heats the greenhouse to a fixed rise above the external temperature, which changes from day to day
+	def predict_lamp_temp(self, internal_temp, external_temp, seconds):
+		lamp = self.parameters["Lamp_Temperature"]
+		return self.settle(internal_temp, external_temp + lamp["Offset"], lamp["Time_Constant"], seconds)
+
+	# Internal temperature after the given number of seconds if the fans are on
+	def predict_fan_temp(self, internal_temp, external_temp, seconds):
+		fans = self.parameters["Fan_Temperature"]
+		return self.settle(internal_temp, external_temp + fans["Offset"], fans["Time_Constant"], seconds)